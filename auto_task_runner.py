@@ -241,42 +241,31 @@ class TaskRunner:
 
     def reclaim_expired_leases(self) -> int:
         """回收过期租约，返回回收数量"""
-        reclaimed = 0
+        reclaimed, _ = self.reclaim_and_select()
+        return reclaimed
+
+    def reclaim_and_select(self) -> tuple[int, Optional[dict]]:
+        """
+        回收过期租约并选择下一个可执行任务（持锁单次遍历任务列表）。
 
+        Returns:
+            (回收数量, 下一个可执行的任务或 None)
+        """
         with TaskFileLock(self.config["task_file"]) as lock:
             data = lock.read()
-            tasks = data.get("tasks", [])
+            tasks, next_task, reclaimed = self.state_machine.tick(data.get("tasks", []))
 
-            for i, task in enumerate(tasks):
-                if task.get("status") == TaskStatus.IN_PROGRESS.value:
-                    claim = task.get("claim")
-                    if claim:
-                        from lib.state_machine import Claim
-                        claim_obj = Claim.from_dict(claim)
-                        if claim_obj.is_expired():
-                            old_run_id = claim["run_id"]
-                            history = task.get("history", [])
-
-                            # 检查是否超过最大重试次数
-                            if len(history) >= self.config["max_attempts"]:
-                                tasks[i] = self.state_machine.abandon_task(
-                                    task, "lease expired, max attempts reached"
-                                )
-                                new_status = "abandoned"
-                            else:
-                                tasks[i] = self.state_machine.abandon_task(task)
-                                tasks[i] = self.state_machine.retry_task(tasks[i])
-                                new_status = "pending (retry)"
-
-                            self.logger.log_reclaim(task["id"], old_run_id, new_status)
-                            reclaimed += 1
-
-            if reclaimed > 0:
+            for task_id, old_run_id, new_status in reclaimed:
+                if new_status == TaskStatus.PENDING.value:
+                    new_status = "pending (retry)"
+                self.logger.log_reclaim(task_id, old_run_id, new_status)
+
+            if reclaimed:
                 data["tasks"] = tasks
                 data["last_modified"] = datetime.now(timezone.utc).isoformat()
                 lock.write(data)
 
-        return reclaimed
+        return len(reclaimed), next_task
 
     def select_next_task(self) -> Optional[dict]:
         """选择下一个可执行任务"""
@@ -476,13 +465,11 @@ class TaskRunner:
             log(f"检测到 {self.config['pause_file']} 文件，暂停执行", "WARN")
             return False, None
 
-        # 回收过期租约
-        reclaimed = self.reclaim_expired_leases()
+        # 回收过期租约并选择任务
+        reclaimed, task = self.reclaim_and_select()
         if reclaimed > 0:
             log(f"回收了 {reclaimed} 个过期租约", "INFO")
 
-        # 选择任务
-        task = self.select_next_task()
         if not task:
             stats = self.get_task_stats()
             if stats.get("blocked", 0) > 0:
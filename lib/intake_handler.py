@@ -56,6 +56,10 @@ class IntakeHandler:
             "verify_required": config.get("verify_required", True),
         })
 
+        # Task.json 任务 ID 索引缓存，以文件 (mtime_ns, size) 为键
+        self._task_ids_cache: set = set()
+        self._task_ids_key: Optional[tuple] = None
+
         # 确保目录存在
         self.inbox_dir.mkdir(parents=True, exist_ok=True)
         self.processed_dir.mkdir(parents=True, exist_ok=True)
@@ -325,6 +329,40 @@ class IntakeHandler:
         mapping_note = f"原 ID {base_id} 冲突，已改名为 {new_id}"
         return new_id, mapping_note
 
+    def _task_file_key(self, task_json_path: str) -> Optional[tuple]:
+        """获取 Task.json 的缓存键 (mtime_ns, size)，文件不存在时返回 None"""
+        try:
+            st = os.stat(task_json_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _get_existing_ids(self, task_json_path: str, data: dict) -> set:
+        """
+        获取 Task.json 中已存在的任务 ID 集合。
+
+        文件自上次写入后未被修改时复用缓存，否则从 data 重建。
+        返回的集合即缓存本身，调用方追加的新 ID 会直接进入缓存；
+        调用方必须在写入成功后调用 _commit_task_ids_cache。
+
+        Args:
+            task_json_path: Task.json 路径
+            data: 已读取的 Task.json 数据
+
+        Returns:
+            已存在的任务 ID 集合
+        """
+        key = self._task_file_key(task_json_path)
+        if key is None or key != self._task_ids_key:
+            self._task_ids_cache = {t["id"] for t in data.get("tasks", [])}
+        # 在写入成功前使缓存失效，避免异常时残留未落盘的 ID
+        self._task_ids_key = None
+        return self._task_ids_cache
+
+    def _commit_task_ids_cache(self, task_json_path: str) -> None:
+        """Task.json 写入成功后，将缓存绑定到新的文件状态"""
+        self._task_ids_key = self._task_file_key(task_json_path)
+
     def merge_to_claude_md(self, project_requirements: str, claude_md_path: str = "CLAUDE.md") -> str:
         """
         最小 diff 合并到 CLAUDE.md。
@@ -388,18 +426,34 @@ class IntakeHandler:
 
         with TaskFileLock(task_json_path) as lock:
             data = lock.read()
-            current_config = data.get("config", {})
-
-            # 只更新 REQ 中出现的字段
-            for key, value in config_updates.items():
-                current_config[key] = value
-
-            data["config"] = current_config
+            current_config = self.merge_config_data(data, config_updates)
             data["last_modified"] = datetime.now(timezone.utc).isoformat()
             lock.write(data)
 
         return current_config
 
+    def merge_config_data(self, data: dict, config_updates: dict) -> dict:
+        """
+        在内存中合并运行参数到已读取的 Task.json 数据。
+
+        供已持有 TaskFileLock 的调用方使用，不做任何文件读写。
+
+        Args:
+            data: 已读取的 Task.json 数据（原地修改）
+            config_updates: 要更新的配置
+
+        Returns:
+            合并后的 config
+        """
+        current_config = data.get("config", {})
+
+        # 只更新 REQ 中出现的字段
+        for key, value in config_updates.items():
+            current_config[key] = value
+
+        data["config"] = current_config
+        return current_config
+
     def convert_seeds_to_tasks(self, task_seeds: list, existing_ids: set) -> list[dict]:
         """
         转换 Task Seeds 为 Task.json 格式。
@@ -536,16 +590,13 @@ class IntakeHandler:
 
                 # 5. 合并 config
                 if req.get("config_updates"):
-                    current_config = data.get("config", {})
-                    for key, value in req["config_updates"].items():
-                        current_config[key] = value
-                    data["config"] = current_config
+                    self.merge_config_data(data, req["config_updates"])
                     result["config_updates"] = req["config_updates"]
 
                 # 6. 转换并追加 tasks
-                existing_ids = {t["id"] for t in data.get("tasks", [])}
+                existing_ids = self._get_existing_ids(task_json_path, data)
                 new_tasks = self.convert_seeds_to_tasks(req["task_seeds"], existing_ids)
-                data["tasks"] = data.get("tasks", []) + new_tasks
+                data.setdefault("tasks", []).extend(new_tasks)
                 result["tasks_added"] = [t["id"] for t in new_tasks]
 
                 # 更新时间戳
@@ -553,6 +604,7 @@ class IntakeHandler:
 
                 # 写入 Task.json
                 lock.write(data)
+                self._commit_task_ids_cache(task_json_path)
 
             # 7. 运行门禁校验
             verify_result = self._run_gate_checks()
@@ -682,14 +734,6 @@ class IntakeHandler:
                 check=True,
             )
 
-            # 获取当前分支
-            branch_result = subprocess.run(
-                ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                capture_output=True,
-                text=True,
-            )
-            branch = branch_result.stdout.strip() if branch_result.returncode == 0 else "main"
-
             # git commit
             tasks_str = ", ".join(tasks_added[:5])
             if len(tasks_added) > 5:
@@ -703,20 +747,26 @@ class IntakeHandler:
                 text=True,
             )
 
+            # 一次 rev-parse 同时获取 commit hash 和当前分支
+            # （--short 隐含 --verify，只接受单个 revision，故记录完整 hash；
+            # 固定长度截断在大仓库中可能有歧义）
+            rev_result = subprocess.run(
+                ["git", "rev-parse", "HEAD", "--abbrev-ref", "HEAD"],
+                capture_output=True,
+                text=True,
+            )
+            rev_lines = rev_result.stdout.splitlines() if rev_result.returncode == 0 else []
+            if len(rev_lines) == 2:
+                commit_hash, branch = rev_lines[0], rev_lines[1]
+            else:
+                commit_hash, branch = "", "main"
+
             if commit_result.returncode != 0:
                 # 可能没有变更
                 if "nothing to commit" in commit_result.stdout:
                     return {"commit": "no-change", "branch": branch}
                 return {"commit": "", "branch": branch}
 
-            # 获取 commit hash
-            hash_result = subprocess.run(
-                ["git", "rev-parse", "--short", "HEAD"],
-                capture_output=True,
-                text=True,
-            )
-            commit_hash = hash_result.stdout.strip() if hash_result.returncode == 0 else ""
-
             return {"commit": commit_hash, "branch": branch}
 
         except Exception:
@@ -740,10 +790,14 @@ class IntakeHandler:
         """
         标记 REQ 为已处理。
 
-        移动到 inbox/processed/ 目录。
+        移动到 inbox/processed/ 目录。同一文件系统内直接 os.replace，
+        失败时（如跨设备）回退到 shutil.move。
 
         Args:
             req_path: REQ 文件路径
         """
         dest = self.processed_dir / req_path.name
-        shutil.move(str(req_path), str(dest))
+        try:
+            os.replace(req_path, dest)
+        except OSError:
+            shutil.move(req_path, dest)
@@ -10,10 +10,197 @@ progress_logger.py - 结构化日志
 - 耗时统计
 """
 
+import atexit
+import mmap
 import os
-from datetime import datetime, timezone
+import queue
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+
+# 秒级时间戳缓存：(epoch 秒, 格式化字符串)，整体替换保证读取一致
+_TS_CACHE: tuple[int, str] = (0, "")
+
+# 日志分段分隔行（log_claim/log_startup/log_stop/log_intake_start 写入），
+# 文本和 UTF-8 字节形式都在模块加载时构建一次
+_SEPARATOR = "=" * 60
+_SEPARATOR_LINE = (_SEPARATOR + "\n").encode("utf-8")
+
+# 写线程退出信号
+_CLOSE = object()
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    """写入全部数据（处理部分写入）"""
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _writer_loop(fd: int, q: queue.SimpleQueue, errors: list) -> None:
+    """
+    单写线程：阻塞等待第一条日志，再取空队列中已积压的日志，
+    合并为一次 write。队列中的 threading.Event 是 flush() 的等待点，
+    在其之前的日志落盘后置位。收到 _CLOSE 时写完积压日志并关闭 fd。
+
+    不持有 ProgressLogger 的引用，实例仍可被正常回收。
+    """
+    while True:
+        item = q.get()
+        chunks = []
+        waiters = []
+        stop = False
+        while True:
+            if item is _CLOSE:
+                stop = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            else:
+                chunks.append(item)
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+
+        if chunks:
+            try:
+                _write_all(fd, b"".join(chunks))
+            except OSError as e:
+                errors.append(e)
+        for waiter in waiters:
+            waiter.set()
+        if stop:
+            os.close(fd)
+            return
+
+
+class _LogWriter:
+    """
+    单个日志文件的写入端：一个 O_APPEND fd + 一个写队列 + 一个写线程。
+
+    同一进程内写同一文件的所有 ProgressLogger 共享一个 _LogWriter
+    （见 _acquire_writer），日志按入队顺序落盘，并合并到同一批 write 中。
+    """
+
+    def __init__(self, file_path: Path):
+        self.file_path = file_path
+        self.refcount = 0
+        self.stopped = False  # 在 _WRITERS_LOCK 下置位，保证 stop() 只执行一次
+        self.fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._start()
+
+    def _start(self) -> None:
+        """创建写队列并启动写线程"""
+        self.queue = queue.SimpleQueue()
+        self.errors = []
+        self.thread = threading.Thread(
+            target=_writer_loop,
+            args=(self.fd, self.queue, self.errors),
+            name=f"ProgressLogger-{self.file_path.name}",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def raise_error(self) -> None:
+        """抛出写线程记录的第一个写入错误"""
+        if self.errors:
+            error = self.errors[0]
+            self.errors.clear()
+            raise error
+
+    def flush(self) -> None:
+        """等待队列中已有的日志全部写入文件"""
+        if self.stopped or threading.current_thread() is self.thread:
+            # 写线程已停止，或在写线程自身上（如 GC 触发的 __del__），
+            # 事件不会再被置位
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+        self.raise_error()
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        通知写线程落盘剩余日志后关闭 fd 并退出。
+
+        Args:
+            wait: 是否等待写线程退出（在写线程自身上调用时总是不等待）
+        """
+        self.queue.put(_CLOSE)
+        if wait and threading.current_thread() is not self.thread:
+            self.thread.join()
+            self.raise_error()
+
+
+# 进程内按文件路径共享的写入端。__del__ 可能在持锁期间由 GC 触发，
+# 因此使用可重入锁
+_WRITERS: dict[Path, _LogWriter] = {}
+_WRITERS_LOCK = threading.RLock()
+
+# 已通知停止但未等待退出的写入端，进程退出时等待其落盘
+_DETACHED: list[_LogWriter] = []
+
+
+def _acquire_writer(file_path: Path) -> _LogWriter:
+    """获取（必要时创建）指定文件的共享写入端"""
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(file_path)
+        if writer is None:
+            writer = _WRITERS[file_path] = _LogWriter(file_path)
+        writer.refcount += 1
+        return writer
+
+
+def _release_writer(writer: _LogWriter, wait: bool = True) -> None:
+    """释放写入端，最后一个使用者负责停止写线程（wait 见 _LogWriter.stop）"""
+    with _WRITERS_LOCK:
+        writer.refcount -= 1
+        if writer.refcount > 0 or writer.stopped:
+            return
+        writer.stopped = True
+        del _WRITERS[writer.file_path]
+        if not wait:
+            _DETACHED[:] = [w for w in _DETACHED if w.thread.is_alive()]
+            _DETACHED.append(writer)
+    writer.stop(wait)
+
+
+@atexit.register
+def _stop_all_writers() -> None:
+    """进程退出时落盘并停止所有仍在使用的写入端"""
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+        for writer in writers:
+            writer.stopped = True
+        detached = _DETACHED[:]
+        _DETACHED.clear()
+    for writer in writers:
+        try:
+            writer.stop()
+        except OSError:
+            pass
+    for writer in detached:
+        writer.thread.join()
+
+
+def _restart_writers_in_child() -> None:
+    """
+    fork 后子进程只继承 _WRITERS，不继承写线程，flush() 会永远等待。
+    为每个写入端换新队列并重启写线程（fd 继承自父进程，仍为 O_APPEND）；
+    队列中尚未落盘的日志由父进程写出，子进程丢弃副本以免重复。
+    """
+    global _WRITERS_LOCK
+    _WRITERS_LOCK = threading.RLock()
+    _DETACHED.clear()
+    for writer in _WRITERS.values():
+        writer._start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_writers_in_child)
 
 
 class ProgressLogger:
@@ -33,6 +220,14 @@ class ProgressLogger:
     下一步: ...
     需要人工: 是/否
     ```
+
+    进程生命周期内每个文件只打开一次（O_APPEND），同一进程中写同一文件的
+    多个实例共享一个 fd 和写线程；多个进程追加同一文件时每次 write 都是
+    原子追加。
+
+    log_* 方法只把日志放入队列，不等待磁盘；后台单写线程把积压的日志
+    合并成一次 write。调用 flush()、进程退出，或发生需要他人读取日志的
+    事件（领取、完成、阻塞、暂停、停止、Intake 结束）时等待落盘。
     """
 
     def __init__(self, file_path: str = "progress.txt"):
@@ -43,16 +238,93 @@ class ProgressLogger:
             file_path: 日志文件路径
         """
         self.file_path = Path(file_path).resolve()
+        self._writer = _acquire_writer(self.file_path)
+        self._closed = False
+        self._close_lock = threading.Lock()
 
     def _timestamp(self) -> str:
-        """获取当前时间戳"""
-        return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        """获取当前时间戳（同一秒内复用已格式化的字符串）"""
+        global _TS_CACHE
+        now = int(time.time())
+        cached_sec, cached_str = _TS_CACHE
+        if now != cached_sec:
+            cached_str = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime(now))
+            _TS_CACHE = (now, cached_str)
+        return cached_str
 
     def _append(self, content: str) -> None:
-        """追加内容到日志文件"""
-        with open(self.file_path, "a", encoding="utf-8") as f:
-            f.write(content)
-            f.write("\n")
+        """将日志放入写队列"""
+        if self._closed:
+            raise ValueError(f"日志文件已关闭: {self.file_path}")
+        self._writer.queue.put((content + "\n").encode("utf-8"))
+
+    def flush(self) -> None:
+        """等待队列中已有的日志全部写入文件"""
+        if self._closed:
+            return
+        self._writer.flush()
+
+    def close(self) -> None:
+        """落盘剩余日志并释放写入端（可重复调用）"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self._writer.flush()
+        finally:
+            _release_writer(self._writer)
+
+    def iter_entries(self) -> Iterator[bytes]:
+        """
+        按 '=' * 60 分隔行切分日志文件，逐段返回（UTF-8 字节）。
+
+        通过只读 mmap 访问文件，不把整个日志读入内存；写入仍走 O_APPEND。
+        返回前先 flush()，保证本进程已记录的日志可见。空段被跳过。
+
+        Yields:
+            去掉首尾换行的日志段
+        """
+        self.flush()
+        try:
+            f = open(self.file_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # 空文件无法映射
+                return
+            with mm:
+                if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                start = 0
+                pos = mm.find(_SEPARATOR_LINE)
+                while pos >= 0:
+                    # 只匹配整行分隔符（排除更长的 '=' 行）
+                    if pos == 0 or mm[pos - 1] == 0x0A:
+                        entry = mm[start:pos].strip(b"\n")
+                        if entry:
+                            yield entry
+                        start = pos + len(_SEPARATOR_LINE)
+                        pos = mm.find(_SEPARATOR_LINE, start)
+                    else:
+                        pos = mm.find(_SEPARATOR_LINE, pos + 1)
+                entry = mm[start:].strip(b"\n")
+                if entry:
+                    yield entry
+
+    def __del__(self) -> None:
+        # GC 可能在任意线程（包括写线程自身）上运行 __del__，这里只释放引用、
+        # 不等待写线程；已入队的日志仍会写出，进程退出时由 atexit 钩子落盘
+        if getattr(self, "_closed", True):
+            return
+        self._closed = True
+        try:
+            _release_writer(self._writer, wait=False)
+        except Exception:
+            pass
 
     def log_claim(
         self,
@@ -73,7 +345,7 @@ class ProgressLogger:
             max_attempts: 最大尝试次数
         """
         entry = f"""
-{'=' * 60}
+{_SEPARATOR}
 [{self._timestamp()}] CLAIM: {task_id}
 运行 ID: {run_id}
 尝试: {attempt}/{max_attempts}
@@ -82,6 +354,7 @@ class ProgressLogger:
 操作: 父进程领取任务，启动子进程
 """
         self._append(entry)
+        self.flush()
 
     def log_complete(
         self,
@@ -122,6 +395,7 @@ class ProgressLogger:
 需要人工: 否
 """
         self._append(entry)
+        self.flush()
 
     def log_fail(
         self,
@@ -196,6 +470,7 @@ class ProgressLogger:
 --- End Packet ---
 """
         self._append(entry)
+        self.flush()
 
     def log_abandon(
         self,
@@ -249,12 +524,13 @@ class ProgressLogger:
             reason: 停止原因
         """
         entry = f"""
-{'=' * 60}
+{_SEPARATOR}
 [{self._timestamp()}] STOP
 原因: {reason}
-{'=' * 60}
+{_SEPARATOR}
 """
         self._append(entry)
+        self.flush()
 
     def log_pause(self, reason: str) -> None:
         """
@@ -268,6 +544,7 @@ class ProgressLogger:
 操作: 进入睡眠循环，等待 PAUSE 文件删除
 """
         self._append(entry)
+        self.flush()
 
     def log_resume(self) -> None:
         """记录恢复事件。"""
@@ -285,7 +562,7 @@ class ProgressLogger:
             config: 配置信息
         """
         entry = f"""
-{'=' * 60}
+{_SEPARATOR}
 [{self._timestamp()}] STARTUP
 运行器 ID: {runner_id}
 配置:
@@ -294,7 +571,7 @@ class ProgressLogger:
   - verify_required: {config.get('verify_required', True)}
   - max_turns: {config.get('max_turns', 50)}
   - timeout: {config.get('timeout', 900)}
-{'=' * 60}
+{_SEPARATOR}
 """
         self._append(entry)
 
@@ -364,7 +641,7 @@ class ProgressLogger:
             req_path: REQ 文件路径
         """
         entry = f"""
-{'=' * 60}
+{_SEPARATOR}
 [{self._timestamp()}] INTAKE_START: {req_id}
 运行 ID: {run_id}
 REQ 文件: {req_path}
@@ -410,6 +687,7 @@ Git 提交: {git.get('commit', '')} ({git.get('branch', '')})
 需要人工: 否
 """
         self._append(entry)
+        self.flush()
 
     def log_intake_fail(
         self,
@@ -443,3 +721,4 @@ REQ ID: {req_id}
 --- End Packet ---
 """
         self._append(entry)
+        self.flush()
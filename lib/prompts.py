@@ -8,51 +8,13 @@ prompts.py - 子进程提示词模板
 4. 不得修改 Task.json 的状态字段
 """
 
+import functools
 from typing import Optional
 
 
-def build_task_prompt(
-    task_id: str,
-    run_id: str,
-    task_description: str,
-    depends_on: list[str] = None,
-    attempt: int = 1,
-    max_attempts: int = 3,
-    verify_command: Optional[str] = None,
-) -> str:
-    """
-    构建子进程任务提示词。
-
-    Args:
-        task_id: 任务 ID
-        run_id: 运行 ID（必须在输出中回传）
-        task_description: 任务描述
-        depends_on: 依赖的任务 ID 列表
-        attempt: 当前尝试次数
-        max_attempts: 最大尝试次数
-        verify_command: 验证命令（可选）
-
-    Returns:
-        格式化的提示词
-    """
-    deps_info = ""
-    if depends_on:
-        deps_info = f"\n依赖任务（已完成）: {', '.join(depends_on)}"
-
-    verify_info = ""
-    if verify_command:
-        verify_info = f"""
-## 验证要求
-
-完成实现后，必须运行验证命令：
-```bash
-{verify_command}
-```
-
-验证必须通过（exit_code == 0）才能标记为 completed。
-"""
+# 提示词模板在模块加载时构建一次，调用时只做 format_map 替换
 
-    return f'''你正在执行一个长期运行项目的单个任务。
+_TASK_PROMPT_TMPL = '''你正在执行一个长期运行项目的单个任务。
 
 ## 重要约束（必须遵守）
 
@@ -113,15 +75,20 @@ def build_task_prompt(
 - completed 必须包含 verify 字段
 '''
 
+_DEPS_INFO_PREFIX = "\n依赖任务（已完成）: "
 
-def build_status_check_prompt() -> str:
-    """
-    构建状态检查提示词（用于 --status 模式）。
+_VERIFY_INFO_TMPL = """
+## 验证要求
 
-    Returns:
-        状态检查提示词
-    """
-    return '''请检查当前项目状态：
+完成实现后，必须运行验证命令：
+```bash
+{verify_command}
+```
+
+验证必须通过（exit_code == 0）才能标记为 completed。
+"""
+
+_STATUS_CHECK_PROMPT = '''请检查当前项目状态：
 
 1. 读取 Task.json 统计任务状态
 2. 读取 progress.txt 查看最近进度
@@ -144,20 +111,7 @@ def build_status_check_prompt() -> str:
 ```
 '''
 
-
-def build_recovery_prompt(task_id: str, run_id: str, error: str) -> str:
-    """
-    构建恢复提示词（用于任务失败后的诊断）。
-
-    Args:
-        task_id: 任务 ID
-        run_id: 运行 ID
-        error: 错误信息
-
-    Returns:
-        恢复提示词
-    """
-    return f'''任务 {task_id} (run_id={run_id}) 执行失败，需要诊断。
+_RECOVERY_PROMPT_TMPL = '''任务 {task_id} (run_id={run_id}) 执行失败，需要诊断。
 
 错误信息：
 {error}
@@ -181,3 +135,82 @@ def build_recovery_prompt(task_id: str, run_id: str, error: str) -> str:
 }}
 ```
 '''
+
+
+@functools.lru_cache(maxsize=256)
+def _deps_info(depends_on: tuple[str, ...]) -> str:
+    """依赖任务段落（同一任务重试时依赖不变，结果可复用）"""
+    return _DEPS_INFO_PREFIX + ", ".join(depends_on)
+
+
+@functools.lru_cache(maxsize=16)
+def _verify_info(verify_command: str) -> str:
+    """验证要求段落（verify_command 来自运行配置，所有任务通常相同）"""
+    return _VERIFY_INFO_TMPL.format_map({"verify_command": verify_command})
+
+
+def build_task_prompt(
+    task_id: str,
+    run_id: str,
+    task_description: str,
+    depends_on: list[str] = None,
+    attempt: int = 1,
+    max_attempts: int = 3,
+    verify_command: Optional[str] = None,
+) -> str:
+    """
+    构建子进程任务提示词。
+
+    Args:
+        task_id: 任务 ID
+        run_id: 运行 ID（必须在输出中回传）
+        task_description: 任务描述
+        depends_on: 依赖的任务 ID 列表
+        attempt: 当前尝试次数
+        max_attempts: 最大尝试次数
+        verify_command: 验证命令（可选）
+
+    Returns:
+        格式化的提示词
+    """
+    deps_info = _deps_info(tuple(depends_on)) if depends_on else ""
+    verify_info = _verify_info(verify_command) if verify_command else ""
+
+    return _TASK_PROMPT_TMPL.format_map({
+        "task_id": task_id,
+        "run_id": run_id,
+        "task_description": task_description,
+        "deps_info": deps_info,
+        "verify_info": verify_info,
+        "attempt": attempt,
+        "max_attempts": max_attempts,
+    })
+
+
+def build_status_check_prompt() -> str:
+    """
+    构建状态检查提示词（用于 --status 模式）。
+
+    Returns:
+        状态检查提示词
+    """
+    return _STATUS_CHECK_PROMPT
+
+
+def build_recovery_prompt(task_id: str, run_id: str, error: str) -> str:
+    """
+    构建恢复提示词（用于任务失败后的诊断）。
+
+    Args:
+        task_id: 任务 ID
+        run_id: 运行 ID
+        error: 错误信息
+
+    Returns:
+        恢复提示词
+    """
+    return _RECOVERY_PROMPT_TMPL.format_map({
+        "task_id": task_id,
+        "run_id": run_id,
+        "error": error,
+    })
@@ -7,7 +7,9 @@ state_machine.py - 任务状态机 + 转移规则
 - 子进程回传 run_id 必须匹配
 """
 
-import uuid
+import os
+import secrets
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from enum import Enum
@@ -25,6 +27,66 @@ class TaskStatus(str, Enum):
     ABANDONED = "abandoned"
 
 
+# 状态值 -> 枚举 的查找表（比 TaskStatus(value) 走 EnumMeta.__call__ 快得多）
+_STATUS_BY_VALUE = {s.value: s for s in TaskStatus}
+
+# 热路径中只需比较原始字符串的状态值
+_PENDING = TaskStatus.PENDING.value
+_IN_PROGRESS = TaskStatus.IN_PROGRESS.value
+_COMPLETED = TaskStatus.COMPLETED.value
+
+
+def _task_status(task: dict) -> TaskStatus:
+    """解析任务状态，未知状态与 TaskStatus(value) 一样抛出 ValueError"""
+    value = task.get("status", _PENDING)
+    try:
+        return _STATUS_BY_VALUE[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"{value!r} is not a valid TaskStatus") from None
+
+
+def _now_iso() -> str:
+    """当前 UTC 时间的 ISO 字符串，与 claim 中时间戳的生成方式一致"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _lease_expired(lease_expires_at: str, now_iso: str) -> bool:
+    """
+    判断租约是否已过期。
+
+    本模块写入的时间戳都由 datetime.now(timezone.utc).isoformat() 生成，
+    格式为 YYYY-MM-DDTHH:MM:SS[.ffffff]+00:00，字段定宽且时区后缀相同，
+    字符串字典序即时间先后顺序（无微秒时 '+' < '.'，同样保序），
+    因此无需解析即可直接比较。其他格式（如手工编辑的 Z 后缀）回退到解析。
+
+    >>> _lease_expired("2024-01-01T00:00:00+00:00", "2024-01-02T00:00:00+00:00")
+    True
+    >>> _lease_expired("2024-01-01T00:00:00.000001+00:00", "2024-01-01T00:00:00+00:00")
+    False
+    >>> _lease_expired("2024-01-01T00:00:00Z", "2024-01-01T00:00:01+00:00")
+    True
+    """
+    if (
+        lease_expires_at.endswith("+00:00") and now_iso.endswith("+00:00")
+        and len(lease_expires_at) in (25, 32) and len(now_iso) in (25, 32)
+    ):
+        return now_iso > lease_expires_at
+    return datetime.fromisoformat(now_iso) > datetime.fromisoformat(lease_expires_at)
+
+
+# 当前进程的运行器 ID（pid 在进程内不变，只需生成一次）
+_RUNNER_ID: Optional[str] = None
+
+
+def _reset_runner_id() -> None:
+    global _RUNNER_ID
+    _RUNNER_ID = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_runner_id)
+
+
 # 状态转移规则
 VALID_TRANSITIONS = {
     TaskStatus.PENDING: {TaskStatus.IN_PROGRESS, TaskStatus.CANCELED},
@@ -42,7 +104,7 @@ VALID_TRANSITIONS = {
 }
 
 
-@dataclass
+@dataclass(slots=True)
 class Claim:
     """任务领取信息"""
     claimed_by: str
@@ -70,14 +132,17 @@ class Claim:
             attempt=data.get("attempt", 1),
         )
 
-    def is_expired(self) -> bool:
-        """检查租约是否过期"""
-        expires = datetime.fromisoformat(self.lease_expires_at)
-        now = datetime.now(timezone.utc)
-        return now > expires
+    def is_expired(self, now_iso: Optional[str] = None) -> bool:
+        """
+        检查租约是否过期。
+
+        Args:
+            now_iso: 当前时间的 ISO 字符串（可选，批量检查时由调用方传入同一个值）
+        """
+        return _lease_expired(self.lease_expires_at, now_iso or _now_iso())
 
 
-@dataclass
+@dataclass(slots=True)
 class VerifyResult:
     """验证结果"""
     command: str
@@ -100,7 +165,7 @@ class VerifyResult:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class GitResult:
     """Git 提交结果"""
     commit: str
@@ -117,7 +182,7 @@ class GitResult:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskResult:
     """任务执行结果"""
     verify: Optional[VerifyResult] = None
@@ -147,7 +212,7 @@ class TaskResult:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class HistoryEntry:
     """历史记录条目"""
     attempt: int
@@ -184,6 +249,9 @@ class TaskStateMachine:
     1. completed 必须有 verify.exit_code == 0
     2. 同一时间最多一个有效 lease
     3. 子进程回传 run_id 必须匹配
+
+    转移方法原地修改并返回传入的 task 字典（守卫检查全部在修改前完成，
+    检查失败时 task 保持不变）。需要保留旧快照的调用方应自行复制。
     """
 
     def __init__(self, config: Optional[dict] = None):
@@ -201,14 +269,14 @@ class TaskStateMachine:
 
     def generate_run_id(self) -> str:
         """生成唯一的运行 ID"""
-        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-        unique = uuid.uuid4().hex[:8]
-        return f"run-{timestamp}-{unique}"
+        return f"run-{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
 
     def generate_runner_id(self) -> str:
-        """生成运行器 ID"""
-        import os
-        return f"runner-pid-{os.getpid()}"
+        """生成运行器 ID（进程内缓存，fork 后的子进程重新生成）"""
+        global _RUNNER_ID
+        if _RUNNER_ID is None:
+            _RUNNER_ID = f"runner-pid-{os.getpid()}"
+        return _RUNNER_ID
 
     def can_transition(self, from_status: TaskStatus, to_status: TaskStatus) -> bool:
         """检查状态转移是否合法"""
@@ -229,12 +297,12 @@ class TaskStateMachine:
             runner_id: 运行器 ID（可选，默认自动生成）
 
         Returns:
-            更新后的任务字典
+            更新后的任务字典（即传入的 task，原地修改）
 
         Raises:
             ValueError: 状态转移不合法或已有有效 lease
         """
-        current_status = TaskStatus(task.get("status", "pending"))
+        current_status = _task_status(task)
 
         # 检查状态
         if current_status != TaskStatus.PENDING:
@@ -265,7 +333,6 @@ class TaskStateMachine:
         )
 
         # 更新任务
-        task = {**task}  # 不可变更新
         task["status"] = TaskStatus.IN_PROGRESS.value
         task["claim"] = claim.to_dict()
         task["last_update"] = now.isoformat()
@@ -291,12 +358,12 @@ class TaskStateMachine:
             summary: 任务摘要
 
         Returns:
-            更新后的任务字典
+            更新后的任务字典（即传入的 task，原地修改）
 
         Raises:
             ValueError: 状态转移不合法、run_id 不匹配或 verify 失败
         """
-        current_status = TaskStatus(task.get("status", "pending"))
+        current_status = _task_status(task)
 
         # 检查状态
         if current_status != TaskStatus.IN_PROGRESS:
@@ -318,8 +385,8 @@ class TaskStateMachine:
         # 创建结果
         result = TaskResult(verify=verify, git=git, summary=summary)
 
-        # 添加历史记录
-        history = list(task.get("history", []))
+        # 添加历史记录（原地追加，不复制已有历史）
+        history = task.setdefault("history", [])
         history.append(HistoryEntry(
             attempt=claim["attempt"],
             run_id=run_id,
@@ -328,10 +395,8 @@ class TaskStateMachine:
         ).to_dict())
 
         # 更新任务
-        task = {**task}
         task["status"] = TaskStatus.COMPLETED.value
         task["result"] = result.to_dict()
-        task["history"] = history
         task["last_update"] = now.isoformat()
         task["claim"] = None  # 清除 claim
 
@@ -354,9 +419,9 @@ class TaskStateMachine:
             verify: 验证结果（可选）
 
         Returns:
-            更新后的任务字典
+            更新后的任务字典（即传入的 task，原地修改）
         """
-        current_status = TaskStatus(task.get("status", "pending"))
+        current_status = _task_status(task)
 
         if current_status != TaskStatus.IN_PROGRESS:
             raise ValueError(f"只能标记 in_progress 状态的任务为失败，当前状态: {current_status}")
@@ -369,8 +434,8 @@ class TaskStateMachine:
 
         now = datetime.now(timezone.utc)
 
-        # 添加历史记录
-        history = list(task.get("history", []))
+        # 添加历史记录（原地追加，不复制已有历史）
+        history = task.setdefault("history", [])
         history.append(HistoryEntry(
             attempt=claim["attempt"],
             run_id=run_id,
@@ -380,9 +445,7 @@ class TaskStateMachine:
         ).to_dict())
 
         # 更新任务
-        task = {**task}
         task["status"] = TaskStatus.FAILED.value
-        task["history"] = history
         task["last_update"] = now.isoformat()
         task["notes"] = error
         task["claim"] = None
@@ -408,9 +471,9 @@ class TaskStateMachine:
             reason: 阻塞原因
 
         Returns:
-            更新后的任务字典
+            更新后的任务字典（即传入的 task，原地修改）
         """
-        current_status = TaskStatus(task.get("status", "pending"))
+        current_status = _task_status(task)
 
         if current_status != TaskStatus.IN_PROGRESS:
             raise ValueError(f"只能标记 in_progress 状态的任务为阻塞，当前状态: {current_status}")
@@ -423,8 +486,8 @@ class TaskStateMachine:
 
         now = datetime.now(timezone.utc)
 
-        # 添加历史记录
-        history = list(task.get("history", []))
+        # 添加历史记录（原地追加，不复制已有历史）
+        history = task.setdefault("history", [])
         history.append(HistoryEntry(
             attempt=claim["attempt"],
             run_id=run_id,
@@ -434,9 +497,7 @@ class TaskStateMachine:
         ).to_dict())
 
         # 更新任务
-        task = {**task}
         task["status"] = TaskStatus.BLOCKED.value
-        task["history"] = history
         task["last_update"] = now.isoformat()
         task["notes"] = reason
         task["claim"] = None
@@ -452,9 +513,9 @@ class TaskStateMachine:
             reason: 放弃原因
 
         Returns:
-            更新后的任务字典
+            更新后的任务字典（即传入的 task，原地修改）
         """
-        current_status = TaskStatus(task.get("status", "pending"))
+        current_status = _task_status(task)
 
         if current_status != TaskStatus.IN_PROGRESS:
             raise ValueError(f"只能放弃 in_progress 状态的任务，当前状态: {current_status}")
@@ -462,8 +523,8 @@ class TaskStateMachine:
         claim = task.get("claim")
         now = datetime.now(timezone.utc)
 
-        # 添加历史记录
-        history = list(task.get("history", []))
+        # 添加历史记录（原地追加，不复制已有历史）
+        history = task.setdefault("history", [])
         if claim:
             history.append(HistoryEntry(
                 attempt=claim.get("attempt", 1),
@@ -474,9 +535,7 @@ class TaskStateMachine:
             ).to_dict())
 
         # 更新任务
-        task = {**task}
         task["status"] = TaskStatus.ABANDONED.value
-        task["history"] = history
         task["last_update"] = now.isoformat()
         task["notes"] = reason
         task["claim"] = None
@@ -491,12 +550,12 @@ class TaskStateMachine:
             task: 任务字典
 
         Returns:
-            更新后的任务字典
+            更新后的任务字典（即传入的 task，原地修改）
 
         Raises:
             ValueError: 超过最大重试次数
         """
-        current_status = TaskStatus(task.get("status", "pending"))
+        current_status = _task_status(task)
 
         if current_status not in {TaskStatus.FAILED, TaskStatus.BLOCKED, TaskStatus.ABANDONED}:
             raise ValueError(f"只能重试 failed/blocked/abandoned 状态的任务，当前状态: {current_status}")
@@ -509,7 +568,6 @@ class TaskStateMachine:
         now = datetime.now(timezone.utc)
 
         # 更新任务
-        task = {**task}
         task["status"] = TaskStatus.PENDING.value
         task["last_update"] = now.isoformat()
 
@@ -523,16 +581,16 @@ class TaskStateMachine:
             tasks: 任务列表
 
         Returns:
-            更新后的任务列表
+            更新后的任务列表（被回收的任务字典原地修改）
         """
         updated_tasks = []
+        now_iso = _now_iso()
 
         for task in tasks:
-            if task.get("status") == TaskStatus.IN_PROGRESS.value:
+            if task.get("status") == _IN_PROGRESS:
                 claim = task.get("claim")
                 if claim:
-                    claim_obj = Claim.from_dict(claim)
-                    if claim_obj.is_expired():
+                    if _lease_expired(claim["lease_expires_at"], now_iso):
                         # 检查是否超过最大重试次数
                         history = task.get("history", [])
                         if len(history) >= self.config["max_attempts"]:
@@ -561,28 +619,84 @@ class TaskStateMachine:
         Returns:
             下一个可执行的任务，或 None
         """
-        # 已完成的任务 ID
-        completed_ids = {
-            t["id"] for t in tasks
-            if t.get("status") == TaskStatus.COMPLETED.value
-        }
-
-        for task in tasks:
-            if task.get("status") != TaskStatus.PENDING.value:
-                continue
-
+        # 单次遍历：收集已完成的任务 ID 和 pending 任务（保持原顺序），
+        # 之后只需检查 pending 任务，不再扫描已完成/已取消的任务
+        completed_ids = set()
+        pending_tasks = []
+        for t in tasks:
+            status = t.get("status")
+            if status == _COMPLETED:
+                completed_ids.add(t["id"])
+            elif status == _PENDING:
+                pending_tasks.append(t)
+
+        now_iso = _now_iso()
+
+        for task in pending_tasks:
             # 检查依赖
-            deps = task.get("depends_on", [])
-            if not all(d in completed_ids for d in deps):
+            if not completed_ids.issuperset(task.get("depends_on", [])):
                 continue
 
             # 检查 lease
             claim = task.get("claim")
-            if claim:
-                claim_obj = Claim.from_dict(claim)
-                if not claim_obj.is_expired():
-                    continue
+            if claim and not _lease_expired(claim["lease_expires_at"], now_iso):
+                continue
 
             return task
 
         return None
+
+    def tick(
+        self, tasks: list[dict]
+    ) -> tuple[list[dict], Optional[dict], list[tuple[str, str, str]]]:
+        """
+        单次遍历完成租约回收和下一个任务选择。
+
+        等价于先调用 reclaim_expired_leases 再对结果调用 select_next_task，
+        但只遍历一次任务列表，租约过期判断直接比较 ISO 字符串。
+
+        Args:
+            tasks: 任务列表
+
+        Returns:
+            (更新后的任务列表（被回收的任务字典原地修改）, 下一个可执行的任务或 None,
+            被回收任务的 [(task_id, 原 run_id, 回收后状态)])
+        """
+        updated_tasks = []
+        reclaimed = []
+        completed_ids = set()
+        pending_candidates = []
+        now_iso = _now_iso()
+        max_attempts = self.config["max_attempts"]
+
+        for task in tasks:
+            status = task.get("status")
+            claim = task.get("claim")
+
+            if status == _IN_PROGRESS:
+                if claim and _lease_expired(claim["lease_expires_at"], now_iso):
+                    old_run_id = claim.get("run_id", "unknown")
+                    if len(task.get("history", [])) >= max_attempts:
+                        task = self.abandon_task(task, "lease expired, max attempts reached")
+                    else:
+                        task = self.abandon_task(task, "lease expired")
+                        task = self.retry_task(task)
+                        pending_candidates.append(task)
+                    reclaimed.append((task["id"], old_run_id, task["status"]))
+            elif status == _COMPLETED:
+                completed_ids.add(task["id"])
+            elif status == _PENDING:
+                # 未过期的 lease 不可领取
+                if not (claim and not _lease_expired(claim["lease_expires_at"], now_iso)):
+                    pending_candidates.append(task)
+
+            updated_tasks.append(task)
+
+        # 依赖可能指向列表中靠后的任务，需在遍历结束后检查
+        next_task = None
+        for task in pending_candidates:
+            if completed_ids.issuperset(task.get("depends_on", [])):
+                next_task = task
+                break
+
+        return updated_tasks, next_task, reclaimed
@@ -13,30 +13,39 @@ schema_validator.py - Task.json schema 校验
 """
 
 import json
+import os
 import sys
+from collections import Counter
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时回退到标准库 json
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # 可选依赖，未安装时总是一次性加载
+    ijson = None
 
 VALID_STATUSES = {"pending", "in_progress", "completed", "failed", "blocked", "canceled", "abandoned"}
 REQUIRED_CONFIG_KEYS = {"lease_ttl_seconds", "max_attempts", "verify_required"}
+REQUIRED_CLAIM_KEYS = {"claimed_by", "run_id", "claimed_at", "lease_expires_at", "attempt"}
 
+# 超过该大小的 Task.json 使用 ijson 流式校验
+STREAMING_THRESHOLD = 8 * 1024 * 1024
 
-def validate_task_json(file_path: str) -> tuple[bool, list[str]]:
-    """
-    校验 Task.json schema。
 
-    Returns:
-        (is_valid, errors)
-    """
-    errors = []
+def _load_json(file_path: str):
+    """读取 JSON 文件，优先使用 orjson 直接解析字节"""
+    if orjson is not None:
+        with open(file_path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    # 1. JSON 可解析
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        return False, [f"文件不存在: {file_path}"]
-    except json.JSONDecodeError as e:
-        return False, [f"JSON 解析错误: {e}"]
 
+def _check_header(data: dict, errors: list[str]) -> None:
+    """校验 version 和 config 字段（校验项 2、3）"""
     # 2. version 字段
     if "version" not in data:
         errors.append("缺少 version 字段")
@@ -52,6 +61,45 @@ def validate_task_json(file_path: str) -> tuple[bool, list[str]]:
         if missing_keys:
             errors.append(f"config 缺少必要键: {missing_keys}")
 
+
+def _check_task(i: int, task: dict, errors: list[str]) -> None:
+    """校验单个 task 的 id、status 和 claim（校验项 6、7）"""
+    if "id" not in task:
+        errors.append(f"tasks[{i}] 缺少 id 字段")
+        return
+
+    task_id = task["id"]
+
+    # 6. status 合法性
+    if "status" not in task:
+        errors.append(f"task '{task_id}' 缺少 status 字段")
+    elif task["status"] not in VALID_STATUSES:
+        errors.append(f"task '{task_id}' 的 status '{task['status']}' 不合法")
+
+    # 7. claim 结构（如果存在且非 null）
+    if "claim" in task and task["claim"] is not None:
+        claim = task["claim"]
+        if not isinstance(claim, dict):
+            errors.append(f"task '{task_id}' 的 claim 应为对象")
+        else:
+            missing_claim_keys = REQUIRED_CLAIM_KEYS - set(claim.keys())
+            if missing_claim_keys:
+                errors.append(f"task '{task_id}' 的 claim 缺少键: {missing_claim_keys}")
+
+
+def _duplicate_errors(id_counts: Counter) -> list[str]:
+    """根据 id 计数生成重复 id 错误（校验项 5）"""
+    duplicates = {task_id for task_id, count in id_counts.items() if count > 1}
+    if duplicates:
+        return [f"存在重复的 task id: {duplicates}"]
+    return []
+
+
+def _validate_loaded(data: dict) -> list[str]:
+    """校验已完整加载到内存的 Task.json"""
+    errors = []
+    _check_header(data, errors)
+
     # 4. tasks 数组
     if "tasks" not in data:
         errors.append("缺少 tasks 字段")
@@ -61,34 +109,111 @@ def validate_task_json(file_path: str) -> tuple[bool, list[str]]:
         tasks = data["tasks"]
 
         # 5. id 唯一性
-        ids = [t.get("id") for t in tasks if "id" in t]
-        if len(ids) != len(set(ids)):
-            duplicates = [id for id in ids if ids.count(id) > 1]
-            errors.append(f"存在重复的 task id: {set(duplicates)}")
+        errors.extend(_duplicate_errors(Counter(t.get("id") for t in tasks if "id" in t)))
 
-        # 6. status 合法性
         for i, task in enumerate(tasks):
-            if "id" not in task:
-                errors.append(f"tasks[{i}] 缺少 id 字段")
+            _check_task(i, task, errors)
+
+    return errors
+
+
+def _validate_streaming(file_path: str) -> list[str]:
+    """
+    流式校验 Task.json。
+
+    逐个构建 tasks 数组中的元素并立即校验，内存占用为 O(最大单个 task)，
+    而不是 O(文件大小)。其余顶层字段（version、config 等）正常构建。
+    错误顺序与 _validate_loaded 一致。
+    """
+    header = {}
+    has_tasks = False
+    tasks_is_list = False
+    id_counts = Counter()
+    task_errors = []
+    task_index = 0
+
+    builder = None
+    depth = 0
+    target = None  # 正在构建的值：顶层键名，或 None 表示 tasks 元素
+
+    with open(file_path, "rb") as f:
+        for prefix, event, value in ijson.parse(f):
+            if builder is None:
+                if prefix == "":
+                    # 根对象的 start_map/end_map/map_key
+                    if event == "map_key":
+                        target = value
+                    continue
+                if prefix == "tasks" and target == "tasks" and event in ("start_array", "end_array"):
+                    has_tasks = tasks_is_list = True
+                    continue
+                builder = ijson.ObjectBuilder()
+                depth = 0
+                if prefix == "tasks.item" and tasks_is_list:
+                    target = None
+
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+            if depth:
                 continue
 
-            task_id = task["id"]
-
-            if "status" not in task:
-                errors.append(f"task '{task_id}' 缺少 status 字段")
-            elif task["status"] not in VALID_STATUSES:
-                errors.append(f"task '{task_id}' 的 status '{task['status']}' 不合法")
-
-            # 7. claim 结构（如果存在且非 null）
-            if "claim" in task and task["claim"] is not None:
-                claim = task["claim"]
-                required_claim_keys = {"claimed_by", "run_id", "claimed_at", "lease_expires_at", "attempt"}
-                if not isinstance(claim, dict):
-                    errors.append(f"task '{task_id}' 的 claim 应为对象")
-                else:
-                    missing_claim_keys = required_claim_keys - set(claim.keys())
-                    if missing_claim_keys:
-                        errors.append(f"task '{task_id}' 的 claim 缺少键: {missing_claim_keys}")
+            # 一个完整的值已构建完成
+            if target is None:
+                task = builder.value
+                if "id" in task:
+                    id_counts[task.get("id")] += 1
+                _check_task(task_index, task, task_errors)
+                task_index += 1
+                target = "tasks"
+            elif target == "tasks":
+                has_tasks = True
+            else:
+                header[target] = builder.value
+            builder = None
+
+    errors = []
+    _check_header(header, errors)
+
+    # 4. tasks 数组
+    if not has_tasks:
+        errors.append("缺少 tasks 字段")
+    elif not tasks_is_list:
+        errors.append("tasks 应为数组")
+    else:
+        # 5. id 唯一性
+        errors.extend(_duplicate_errors(id_counts))
+        errors.extend(task_errors)
+
+    return errors
+
+
+def validate_task_json(file_path: str) -> tuple[bool, list[str]]:
+    """
+    校验 Task.json schema。
+
+    文件超过 STREAMING_THRESHOLD 且安装了 ijson 时流式校验，
+    否则一次性加载后校验。
+
+    Returns:
+        (is_valid, errors)
+    """
+    # 1. JSON 可解析
+    try:
+        if ijson is not None and os.path.getsize(file_path) > STREAMING_THRESHOLD:
+            errors = _validate_streaming(file_path)
+        else:
+            errors = _validate_loaded(_load_json(file_path))
+    except FileNotFoundError:
+        return False, [f"文件不存在: {file_path}"]
+    except json.JSONDecodeError as e:
+        return False, [f"JSON 解析错误: {e}"]
+    except Exception as e:
+        if ijson is not None and isinstance(e, ijson.JSONError):
+            return False, [f"JSON 解析错误: {e}"]
+        raise
 
     return len(errors) == 0, errors
 
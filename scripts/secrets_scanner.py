@@ -15,108 +15,593 @@ secrets_scanner.py - 敏感信息扫描
 - Generic secret: (password|secret|api_key|apikey)[=:]\\s*['""]?[a-zA-Z0-9_-]{8,}
 """
 
+import functools
+import hashlib
+import heapq
+import itertools
+import mmap
 import os
 import re
 import subprocess
 import sys
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+try:
+    import hyperscan
+except ImportError:  # 可选依赖，未安装时直接用 re 扫描
+    hyperscan = None
+
+try:
+    import re2
+except ImportError:  # 可选依赖，没有 hyperscan 时的预筛备选
+    re2 = None
+
+try:
+    import ahocorasick
+except ImportError:  # 可选依赖，未安装时逐个关键字 find
+    ahocorasick = None
+
+# Generic Secret 由关键字 + 赋值尾部组成，关键字单独用多模式字符串查找定位
+_GENERIC_KEYWORDS = ("password", "secret", "api_key", "apikey", "token")
+_GENERIC_TAIL = r'\s*[=:]\s*[\'"]?[a-zA-Z0-9_\-]{16,}'
+
+# 私钥头几乎是固定字符串，不进合并正则：bytes.find 定位前缀后只校验很短的尾部
+_PRIVATE_KEY_PREFIX = b"-----BEGIN"
+_PRIVATE_KEY_TAIL_RE = re.compile(rb'\s+(RSA\s+|EC\s+|OPENSSH\s+)?PRIVATE\s+KEY-----')
 
 # 检测模式
 PATTERNS = [
     (r'sk-[a-zA-Z0-9]{20,}', 'OpenAI API Key'),
     (r'AKIA[0-9A-Z]{16}', 'AWS Access Key'),
-    (r'-----BEGIN\s+(RSA\s+|EC\s+|OPENSSH\s+)?PRIVATE\s+KEY-----', 'Private Key'),
-    (r'(?i)(password|secret|api_key|apikey|token)\s*[=:]\s*[\'"]?[a-zA-Z0-9_\-]{16,}', 'Generic Secret'),
+    (rf'(?i:{"|".join(_GENERIC_KEYWORDS)}){_GENERIC_TAIL}', 'Generic Secret'),
     (r'ghp_[a-zA-Z0-9]{36}', 'GitHub Personal Access Token'),
     (r'gho_[a-zA-Z0-9]{36}', 'GitHub OAuth Token'),
     (r'xox[baprs]-[a-zA-Z0-9\-]{10,}', 'Slack Token'),
 ]
 
 
-def scan_file(file_path: str) -> list[dict]:
+@functools.lru_cache(maxsize=None)
+def _combined_for(ids: frozenset[int]) -> re.Pattern:
+    """
+    把 ids 对应的模式合并为一个带命名分组的交替正则，单次遍历内容即可匹配；
+    命中的分组名 p<i> 对应 PATTERNS[i]。模式均为 ASCII，直接在 bytes 上匹配，
+    省去 UTF-8 解码
+    """
+    return re.compile("|".join(
+        f"(?P<p{i}>{pattern})" for i, (pattern, _) in enumerate(PATTERNS) if i in ids
+    ).encode("ascii"))
+
+
+# 所有正则都在模块级编译一次，扫描时只调用编译好的 Pattern 对象的方法；
+# 不要改用 re.finditer(pattern_str, ...) 等模块函数，它们每次调用都要查
+# re 内部的编译缓存。模式不需要 DOTALL / MULTILINE，编译时不加任何标志
+COMBINED = _combined_for(frozenset(range(len(PATTERNS))))
+NAMES = [name for _, name in PATTERNS] + ["Private Key"]
+
+_GENERIC_INDEX = NAMES.index("Generic Secret")
+_PRIVATE_KEY_INDEX = NAMES.index("Private Key")
+_ALL_IDS = frozenset(range(len(PATTERNS)))
+_GROUP_INDEX = {f"p{i}": i for i in _ALL_IDS}
+
+# 除 Generic Secret 外每个模式都以固定字面量开头，内容中没有该字面量时模式不可能匹配
+_LITERAL_PREFIXES = {
+    NAMES.index("OpenAI API Key"): b"sk-",
+    NAMES.index("AWS Access Key"): b"AKIA",
+    NAMES.index("GitHub Personal Access Token"): b"ghp_",
+    NAMES.index("GitHub OAuth Token"): b"gho_",
+    NAMES.index("Slack Token"): b"xox",
+}
+
+
+@dataclass(slots=True)
+class Finding:
+    """一条敏感信息发现（masked 为脱敏后的匹配内容）"""
+    file: str
+    line: int
+    type: str
+    masked: str
+
+
+# 超过该大小的文件分块扫描，块间保留 CHUNK_OVERLAP 字节以免漏掉跨块的匹配
+LARGE_FILE_THRESHOLD = 8 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# 分块扫描时，长于 _WS_RUN_LIMIT 的空白串只保留首尾各一半：模式里的空白都是
+# \s* / \s+，不关心空白串长度，匹配结果不变。这样除末尾开放的值串外，任何
+# 匹配的长度都有上界（最长的私钥头为 10+7+7+8+3*_WS_RUN_LIMIT = 224），
+# CHUNK_OVERLAP 不小于该上界，块末之前开始的匹配尝试总能在块内得出结论
+_WS_RUN_LIMIT = 64
+_WS_RUN_RE = re.compile(rb'\s{%d,}' % (_WS_RUN_LIMIT + 1))
+CHUNK_OVERLAP = 256
+
+# 以开放重复结尾的模式及其值串字符类。块末被截断的这类匹配已满足最短长度，
+# 直接记为发现，后续块只需跳过值串的剩余部分
+_OPEN_RUN_RES = {
+    NAMES.index("OpenAI API Key"): re.compile(rb'[a-zA-Z0-9]*'),
+    _GENERIC_INDEX: re.compile(rb'[a-zA-Z0-9_\-]*'),
+    NAMES.index("Slack Token"): re.compile(rb'[a-zA-Z0-9\-]*'),
+}
+
+# 待扫描文件达到该数量时使用多进程并行扫描，文件少时进程池启动开销不划算
+PARALLEL_MIN_FILES = 16
+
+
+def _build_hyperscan_db():
+    """把全部模式编译进一个 Hyperscan 数据库，每个模式命中一次即停止上报"""
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[pattern.encode("ascii") for pattern, _ in PATTERNS],
+        ids=list(range(len(PATTERNS))),
+        flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(PATTERNS),
+    )
+    return db
+
+
+def _re2_pattern(pattern: str) -> bytes:
+    """转换为 RE2 模式：RE2 的 \\s 不含 \\v，换成与 re 一致的字符类，匹配结果不变"""
+    return pattern.replace(r'\s', r'[\t\n\v\f\r ]').encode("ascii")
+
+
+def _build_re2_set():
+    """把全部模式编译进一个 RE2::Set（单个 DFA，线性时间），Match 返回命中的模式下标"""
+    pattern_set = re2.Set.SearchSet(re2.Options())
+    for pattern, _ in PATTERNS:
+        pattern_set.Add(_re2_pattern(pattern))
+    pattern_set.Compile()
+    return pattern_set
+
+
+def _compile_linear(pattern: str):
+    """
+    优先用 re2 编译 pattern，未安装或 RE2 不支持该模式时回退到 re。
+
+    扫描的 runs/*.json 和 diff 内容不可信，而本脚本是 CI 门禁：正则匹配
+    时间必须与输入长度成线性关系，否则构造的输入可以让回溯引擎（re）
+    长时间空转、拖死门禁（ReDoS）。RE2 基于自动机，不回溯，保证线性时间。
+    """
+    if re2 is not None:
+        try:
+            return re2.compile(_re2_pattern(pattern))
+        except re2.error:
+            pass
+    return re.compile(pattern.encode("ascii"))
+
+
+# 预筛引擎优先 hyperscan，其次 re2，都没有时不预筛
+_HS_DB = _build_hyperscan_db() if hyperscan is not None else None
+_RE2_SET = _build_re2_set() if _HS_DB is None and re2 is not None else None
+
+# Generic Secret 的尾部含无界重复，是最容易被构造输入拖慢的规则，
+# 线性时间匹配是安全要求而非优化：有 re2 时必须用 re2
+_GENERIC_TAIL_RE = _compile_linear(_GENERIC_TAIL)
+
+
+def _fired_patterns(content) -> tuple[set[int], int]:
+    """
+    预筛 content，返回 (可能匹配的模式下标, 最早可能的匹配起点)。
+
+    优先用 hyperscan / re2 得到确切命中的模式；都没有时用 bytes.find
+    （C 层 memchr）探测各模式的字面量前缀，此时 Generic Secret 总是保留，
+    由 _generic_matches 的关键字查找把关。
+    """
+    if _HS_DB is not None:
+        fired = set()
+
+        def on_match(pattern_id, start, end, flags, context):
+            fired.add(pattern_id)
+
+        _HS_DB.scan(content, match_event_handler=on_match)
+        return fired, 0
+
+    if _RE2_SET is not None:
+        return set(_RE2_SET.Match(content) or ()), 0
+
+    fired = {_GENERIC_INDEX}
+    first = len(content)
+    find = content.find
+    for index, literal in _LITERAL_PREFIXES.items():
+        pos = find(literal)
+        if pos >= 0:
+            fired.add(index)
+            first = min(first, pos)
+    return fired, first
+
+
+def _build_keyword_automaton():
+    """Generic Secret 关键字的 Aho-Corasick 自动机，值为关键字长度"""
+    automaton = ahocorasick.Automaton()
+    for keyword in _GENERIC_KEYWORDS:
+        automaton.add_word(keyword, len(keyword))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton() if ahocorasick is not None else None
+
+
+def _find_all(content, literal: bytes):
+    """依次产出 literal 在 content 中每次出现的位置（可重叠）"""
+    find = content.find
+    pos = find(literal)
+    while pos >= 0:
+        yield pos
+        pos = find(literal, pos + 1)
+
+
+def _private_key_matches(content) -> list[tuple[int, int, int]]:
+    """查找私钥头，返回按起点排序的 (start, end, pattern_index)"""
+    tail_match = _PRIVATE_KEY_TAIL_RE.match
+    offset = len(_PRIVATE_KEY_PREFIX)
+    matches = []
+    for start in _find_all(content, _PRIVATE_KEY_PREFIX):
+        tail = tail_match(content, start + offset)
+        if tail is not None:
+            matches.append((start, tail.end(), _PRIVATE_KEY_INDEX))
+    return matches
+
+
+def _keyword_hits(content):
+    """
+    按起点顺序产出 Generic Secret 关键字的出现位置 (start, keyword_length)。
+
+    按 CHUNK_SIZE 窗口小写化后查找（安装了 pyahocorasick 时单遍 Aho-Corasick，
+    否则逐个关键字 find），窗口间重叠关键字长度 - 1 字节，内存占用为
+    O(CHUNK_SIZE)，不复制整个 mmap。bytes.lower 只转换 ASCII，与 (?i) 的 bytes
+    语义一致。
+    """
+    overlap = max(map(len, _GENERIC_KEYWORDS)) - 1
+    for base in range(0, len(content), CHUNK_SIZE):
+        window = content[base:base + CHUNK_SIZE + overlap].lower()
+        if _KEYWORD_AUTOMATON is not None:
+            hits = [
+                (end - length + 1, length)
+                for end, length in _KEYWORD_AUTOMATON.iter(window.decode("latin-1"))
+            ]
+        else:
+            hits = []
+            for keyword in _GENERIC_KEYWORDS:
+                keyword = keyword.encode("ascii")
+                hits.extend((pos, len(keyword)) for pos in _find_all(window, keyword))
+        hits.sort()
+        for start, length in hits:
+            if start < CHUNK_SIZE:  # 重叠区内开始的关键字留给下一个窗口
+                yield base + start, length
+
+
+def _generic_matches(content):
+    """
+    按起点顺序产出 Generic Secret 匹配 (start, end, pattern_index)。
+
+    先由 _keyword_hits 定位关键字，再在关键字之后锚定匹配赋值尾部。
+    没有关键字的内容不会运行任何正则。
+    """
+    # 热循环内只用局部变量，避免每次迭代的全局和属性查找
+    tail_match = _GENERIC_TAIL_RE.match
+    generic_index = _GENERIC_INDEX
+    for start, length in _keyword_hits(content):
+        tail = tail_match(content, start + length)
+        if tail is not None:
+            yield start, tail.end(), generic_index
+
+
+def _iter_matches(content):
+    """
+    按单个交替正则的语义（从左到右、不重叠）产出 content 中的匹配
+    (start, end, pattern_index)，pattern_index 对应 NAMES。
+
+    先由 _fired_patterns 预筛出可能出现的模式，未出现的模式在任何位置都
+    不会匹配，不必参与扫描；合并正则从最早的字面量前缀处开始。Generic Secret
+    和私钥头分别由 _generic_matches、_private_key_matches 单独查找，其余模式
+    合并为一个正则，各路结果按起点归并后去掉与前一匹配重叠的部分。
+    """
+    fired, first = _fired_patterns(content)
+
+    other_ids = frozenset(fired) - {_GENERIC_INDEX}
+    others = ()
+    if other_ids:
+        group_index = _GROUP_INDEX
+        others = (
+            (match.start(), match.end(), group_index[match.lastgroup])
+            for match in _combined_for(other_ids).finditer(content, first)
+        )
+    generic = _generic_matches(content) if _GENERIC_INDEX in fired else iter(())
+    first_generic = next(generic, None)
+    private_keys = _private_key_matches(content)
+
+    if first_generic is None and not private_keys:
+        # 只有合并正则一路时其结果本身就不重叠，无需归并
+        yield from others
+        return
+
+    if first_generic is not None:
+        generic = itertools.chain((first_generic,), generic)
+    last_end = 0
+    for start, end, index in heapq.merge(others, generic, private_keys):
+        if start >= last_end:
+            last_end = end
+            yield start, end, index
+
+
+def _count_newlines(buf, start: int, end: int) -> int:
+    """统计 buf[start:end] 中的换行数（mmap 没有 count，用 find 逐个跳过）"""
+    find = buf.find
+    count = 0
+    pos = find(b'\n', start, end)
+    while pos >= 0:
+        count += 1
+        pos = find(b'\n', pos + 1, end)
+    return count
+
+
+def _make_finding(file_path: str, line_num: int, index: int, matched: bytes) -> Finding:
+    """由一次匹配生成 Finding（不显示完整 secret）"""
+    matched = matched.decode("utf-8", "replace")
+    masked = matched[:8] + "..." + matched[-4:] if len(matched) > 16 else matched[:4] + "..."
+    return Finding(file_path, line_num, NAMES[index], masked)
+
+
+def _collapse_ws(buf: bytes) -> tuple[bytes, list[tuple[int, int]]]:
+    """
+    把 buf 中长于 _WS_RUN_LIMIT 的空白串压缩为首尾各 _WS_RUN_LIMIT // 2 字节。
+
+    Returns:
+        (压缩后的 buf, [(删除点在新 buf 中的位置, 删掉的换行数)])
+    """
+    half = _WS_RUN_LIMIT // 2
+    parts = []
+    removed = []
+    prev = 0
+    kept = 0
+    for match in _WS_RUN_RE.finditer(buf):
+        cut_start = match.start() + half
+        cut_end = match.end() - half
+        parts.append(buf[prev:cut_start])
+        kept += cut_start - prev
+        removed.append((kept, buf.count(b'\n', cut_start, cut_end)))
+        prev = cut_end
+    if not removed:
+        return buf, removed
+    parts.append(buf[prev:])
+    return b"".join(parts), removed
+
+
+def _clip(matched: bytes) -> bytes:
+    """超长匹配只保留首尾各 32 字节，足够生成 masked"""
+    return matched if len(matched) <= 64 else matched[:32] + matched[-32:]
+
+
+def _scan_in_chunks(f, file_path: str) -> list[Finding]:
+    r"""
+    分块扫描大文件，内存占用为 O(CHUNK_SIZE)，时间与文件大小成线性关系。
+
+    每块与上一块末尾未处理的部分拼接，压缩过长的空白串后匹配。块末
+    CHUNK_OVERLAP 字节内开始的匹配留到下一块重新匹配；触到块末的开放值串
+    匹配直接记为发现，下一块只跳过值串的剩余部分，不再缓存。行号由跨块
+    累加的换行数（含压缩掉的换行）得出。
+
+    >>> import io
+    >>> def scan(data):
+    ...     return [(f.line, f.type, f.masked) for f in _scan_in_chunks(io.BytesIO(data), "f")]
+    >>> pad = b"a" * (CHUNK_SIZE - 300)
+    >>> scan(pad + b"password" + b" " * 400 + b'= "ABCDEFGHIJKLMNOPQRSTUV"' + b"b" * CHUNK_SIZE)
+    [(1, 'Generic Secret', 'password...STUV')]
+    >>> scan(pad + b" -----BEGIN RSA" + b"\n" * 400 + b"PRIVATE KEY-----\nsk-" + b"q" * 25)
+    [(1, 'Private Key', '-----BEG...----'), (402, 'OpenAI API Key', 'sk-qqqqq...qqqq')]
+    >>> scan(b"token=" + b"A" * (3 * CHUNK_SIZE) + b"!\nAKIA" + b"B" * 16)
+    [(1, 'Generic Secret', 'token=AA...AAAA'), (2, 'AWS Access Key', 'AKIABBBB...BBBB')]
+    """
+    findings = []
+    # 同一行重复出现的同一 secret 只报告一次；开放值串可能跨很多块，
+    # 按完整匹配内容的摘要去重，不保留整个匹配
+    seen = set()
+
+    def add(line_num: int, index: int, clipped: bytes, digest) -> None:
+        key = (line_num, digest.digest())
+        if key not in seen:
+            seen.add(key)
+            findings.append(_make_finding(file_path, line_num, index, clipped))
+
+    line_num = 1
+    buf = b""
+    removed = []    # buf 中压缩掉的空白：[(位置, 换行数)]
+    pending = None  # 被块末截断的开放值串匹配：(index, line_num, clipped, digest)
+
+    while True:
+        block = f.read(CHUNK_SIZE)
+        at_eof = not block
+
+        if pending is not None:
+            index, match_line, clipped, digest = pending
+            run = _OPEN_RUN_RES[index].match(block).end()
+            clipped = _clip(clipped + block[:run])
+            digest.update(block[:run])
+            if run == len(block) and not at_eof:
+                pending = index, match_line, clipped, digest
+                continue
+            add(match_line, index, clipped, digest)
+            pending = None
+            block = block[run:]
+
+        buf, new_removed = _collapse_ws(buf + block if buf else block)
+        if new_removed:
+            # 上一块留下的删除点都在本次新删除点之前或与之重合，位置不变
+            removed = sorted(removed + new_removed)
+        cutoff = len(buf) if at_eof else max(len(buf) - CHUNK_OVERLAP, 0)
+        keep = cutoff
+        last_pos = 0
+        last_end = 0
+        ri = 0
+
+        for start, end, index in _iter_matches(buf):
+            if start >= cutoff:
+                keep = max(cutoff, last_end)
+                break
+            line_num += buf.count(b'\n', last_pos, start)
+            while ri < len(removed) and removed[ri][0] < start:
+                line_num += removed[ri][1]
+                ri += 1
+            last_pos = start
+            last_end = end
+            matched = buf[start:end]
+            digest = hashlib.blake2b(matched, digest_size=16)
+            if not at_eof and end == len(buf) and index in _OPEN_RUN_RES:
+                pending = index, line_num, _clip(matched), digest
+                keep = end
+                break
+            add(line_num, index, _clip(matched), digest)
+        else:
+            keep = max(cutoff, last_end)
+
+        if at_eof:
+            return findings
+        line_num += buf.count(b'\n', last_pos, keep)
+        while ri < len(removed) and removed[ri][0] < keep:
+            line_num += removed[ri][1]
+            ri += 1
+        removed = [(pos - keep, count) for pos, count in removed[ri:]]
+        buf = buf[keep:]
+
+
+def scan_file(file_path: str) -> list[Finding]:
     """扫描单个文件中的敏感信息。"""
     findings = []
 
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
+        f = open(file_path, "rb")
     except (FileNotFoundError, PermissionError):
         return findings
 
-    for pattern, name in PATTERNS:
-        for match in re.finditer(pattern, content):
-            # 获取行号
-            line_num = content[:match.start()].count('\n') + 1
-            # 获取匹配内容的前后文（不显示完整 secret）
-            matched = match.group()
-            masked = matched[:8] + "..." + matched[-4:] if len(matched) > 16 else matched[:4] + "..."
-
-            findings.append({
-                "file": file_path,
-                "line": line_num,
-                "type": name,
-                "masked": masked,
-            })
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return findings  # 空文件无法 mmap
+        if size > LARGE_FILE_THRESHOLD:
+            return _scan_in_chunks(f, file_path)
+        # 只读映射文件，正则直接在映射上匹配，不把整个文件复制到进程内存
+        content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        # 匹配按位置递增产生，行号只需累加上一匹配到本匹配之间的换行数。
+        # 热循环内只用局部变量，避免每次迭代的全局和属性查找
+        count_newlines = _count_newlines
+        make_finding = _make_finding
+        append = findings.append
+        # 同一行重复出现的同一 secret 只报告一次
+        seen = set()
+        seen_add = seen.add
+        line_num = 1
+        last_pos = 0
+
+        for start, end, index in _iter_matches(content):
+            line_num += count_newlines(content, last_pos, start)
+            last_pos = start
+            key = (line_num, content[start:end])
+            if key not in seen:
+                seen_add(key)
+                append(make_finding(file_path, line_num, index, key[1]))
+    finally:
+        content.close()
 
     return findings
 
 
-def scan_git_diff() -> list[dict]:
+def _added_lines(diff: bytes) -> bytes:
+    """
+    从 unified diff 中取出新增行（保留行首 "+"），去重后以换行连接。
+
+    只关心引入的内容：删除行、上下文行以及 diff --git / index / ---/+++ /
+    @@ 等元数据都不扫描。文件头按状态跳过而不是按 "+++" 前缀过滤，
+    新增内容本身以 "++" 开头的行不会被误删。
+
+    暂存区与工作区分别 diff 时（无 HEAD 的回退路径）同一新增行会出现两次，
+    按首次出现顺序去重后只扫描一次。每行都以 "+" 开头，行与行之间不会拼出
+    跨行的匹配，去重不影响结果。
+    """
+    added = []
+    in_header = False
+    for line in diff.split(b"\n"):
+        if line.startswith(b"diff --git "):
+            in_header = True
+        elif line.startswith(b"@@"):
+            in_header = False
+        elif not in_header and line.startswith(b"+"):
+            added.append(line)
+    return b"\n".join(dict.fromkeys(added))
+
+
+def scan_git_diff() -> list[Finding]:
     """扫描 git diff 中的敏感信息。"""
     findings = []
 
-    try:
-        result = subprocess.run(
-            ["git", "diff", "--cached", "--diff-filter=ACMR"],
+    def run_git_diff(*args: str) -> subprocess.CompletedProcess:
+        # 按字节读取输出：模式均为 ASCII，无需解码整个 diff
+        return subprocess.run(
+            ["git", "diff", *args],
             capture_output=True,
-            text=True,
             timeout=30,
-            encoding="utf-8",
-            errors="ignore"
         )
-        diff_content = result.stdout or ""
 
-        # 也检查未暂存的更改
-        result2 = subprocess.run(
-            ["git", "diff"],
-            capture_output=True,
-            text=True,
-            timeout=30,
-            encoding="utf-8",
-            errors="ignore"
-        )
-        diff_content += result2.stdout or ""
+    try:
+        # 已暂存与未暂存的更改相对 HEAD 一次取出，只启动一个 git 进程
+        result = run_git_diff("HEAD", "--diff-filter=ACMR")
+        if result.returncode == 0:
+            diff_content = result.stdout or b""
+        else:
+            # 尚无提交（HEAD 不存在）时退回分别检查暂存区和工作区
+            diff_content = run_git_diff("--cached", "--diff-filter=ACMR").stdout or b""
+            diff_content += run_git_diff().stdout or b""
 
     except (subprocess.TimeoutExpired, FileNotFoundError):
         return findings
 
-    for pattern, name in PATTERNS:
-        for match in re.finditer(pattern, diff_content):
-            matched = match.group()
-            masked = matched[:8] + "..." + matched[-4:] if len(matched) > 16 else matched[:4] + "..."
-
-            findings.append({
-                "file": "git diff",
-                "line": 0,
-                "type": name,
-                "masked": masked,
-            })
+    diff_bytes = _added_lines(diff_content)
+    # diff 的行号都记为 0，同一 secret 在多处新增时只报告一次
+    seen = set()
+    for start, end, index in _iter_matches(diff_bytes):
+        matched = diff_bytes[start:end]
+        if matched not in seen:
+            seen.add(matched)
+            findings.append(_make_finding("git diff", 0, index, matched))
 
     return findings
 
 
+def scan_files(file_paths: list[str]) -> list[Finding]:
+    """
+    扫描多个文件，结果按 file_paths 顺序返回。
+
+    文件数不少于 PARALLEL_MIN_FILES 且有多个 CPU 时用进程池并行扫描；
+    各工作进程导入本模块时各自编译一次正则和预筛数据库。
+    """
+    workers = min(len(file_paths), os.cpu_count() or 1)
+    if len(file_paths) < PARALLEL_MIN_FILES or workers < 2:
+        return [finding for path in file_paths for finding in scan_file(path)]
+
+    chunksize = max(1, len(file_paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(scan_file, file_paths, chunksize=chunksize)
+        return [finding for result in results for finding in result]
+
+
 def main():
-    findings = []
+    files = []
 
     # 扫描 progress.txt
     if os.path.exists("progress.txt"):
-        findings.extend(scan_file("progress.txt"))
+        files.append("progress.txt")
+
+    # 扫描 runs/*.json（scandir 的 DirEntry 自带类型信息，无需逐个 stat）
+    try:
+        with os.scandir("runs") as entries:
+            files.extend(
+                entry.path for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        pass
 
-    # 扫描 runs/*.json
-    runs_dir = Path("runs")
-    if runs_dir.exists():
-        for f in runs_dir.glob("*.json"):
-            findings.extend(scan_file(str(f)))
+    findings = scan_files(files)
 
     # 扫描 git diff
     findings.extend(scan_git_diff())
@@ -124,7 +609,7 @@ def main():
     if findings:
         print("SECRETS_FOUND")
         for f in findings:
-            print(f"  - [{f['type']}] {f['file']}:{f['line']} -> {f['masked']}")
+            print(f"  - [{f.type}] {f.file}:{f.line} -> {f.masked}")
         sys.exit(1)
     else:
         print("SECRETS_OK")